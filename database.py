@@ -5,28 +5,119 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
+from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo import MongoClient
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 import os
+import logging
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 _client = None
 db = None
+# Collection handles built once per worker instead of on every request
+opportunities = None
+userprofiles = None
 
 database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
-if database_url and database_name:
-    _client = MongoClient(database_url)
-    db = _client[database_name]
+# Connection budget shared by all worker processes. Each worker gets an even slice,
+# but never fewer than 10 connections, so with many workers the total can exceed it.
+total_connections = int(os.getenv("MONGO_TOTAL_CONNECTIONS", "100"))
+web_concurrency = int(os.getenv("WEB_CONCURRENCY", "1"))
+max_pool_size = max(10, total_connections // max(1, web_concurrency))
+
+def connect_db():
+    """Create the MongoDB client for this process (call once per worker, after fork)"""
+    global _client, db, opportunities, userprofiles
+    if _client is None and database_url and database_name:
+        if max_pool_size * web_concurrency > total_connections:
+            logger.warning(
+                "%d workers x maxPoolSize %d exceeds MONGO_TOTAL_CONNECTIONS=%d",
+                web_concurrency, max_pool_size, total_connections,
+            )
+        _client = AsyncIOMotorClient(
+            database_url,
+            maxPoolSize=max_pool_size,
+            minPoolSize=5,
+            waitQueueTimeoutMS=2000,
+            # Aware UTC datetimes, so every response renderer emits an explicit offset
+            tz_aware=True,
+        )
+        db = _client[database_name]
+        opportunities = db["opportunity"]
+        userprofiles = db["userprofile"]
+    return db
+
+async def ensure_indexes():
+    """Create the indexes backing the hot query paths (idempotent)"""
+    if db is None:
+        return
+
+    indexes = [
+        # Only one text index is allowed per collection
+        (opportunities, [("title", "text"), ("description", "text"), ("tags", "text")], {"name": "oppText"}),
+        (opportunities, [("status", 1), ("city", 1), ("category", 1)], {}),
+        (opportunities, [("status", 1), ("deadline_days", -1)], {}),
+        # Lets the online/hybrid $or branch of interest-less recommendations seek instead of scan
+        (opportunities, [("status", 1), ("mode", 1)], {}),
+        (userprofiles, [("email", 1)], {"unique": True}),
+    ]
+    # One failing index (e.g. a conflicting existing definition) must not skip the rest
+    for collection, keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except Exception as e:
+            logger.warning("Creating index %s on %s failed: %s", keys, collection.name, e)
+
+# Whole days from the epoch to application_deadline, 0 when missing or not a date
+DEADLINE_DAYS_EXPR = {"$ifNull": [
+    {"$floor": {"$divide": [
+        {"$convert": {"input": "$application_deadline", "to": "long", "onError": None, "onNull": None}},
+        1000 * 60 * 60 * 24,
+    ]}},
+    0
+]}
+
+def backfill_deadline_days():
+    """Materialize deadline_days on opportunities written before it existed (idempotent)
+
+    Synchronous one-off migration, run once per deploy from gunicorn's master
+    process (see gunicorn_conf.on_starting) rather than in every worker. Outside
+    gunicorn: python -c "import database; database.backfill_deadline_days()"
+    """
+    if not (database_url and database_name):
+        return 0
+    client = MongoClient(database_url, serverSelectionTimeoutMS=5000)
+    try:
+        result = client[database_name]["opportunity"].update_many(
+            {"deadline_days": {"$exists": False}},
+            [{"$set": {"deadline_days": DEADLINE_DAYS_EXPR}}],
+        )
+        return result.modified_count
+    finally:
+        client.close()
+
+def close_db():
+    """Close the MongoDB client for this process"""
+    global _client, db, opportunities, userprofiles
+    if _client is not None:
+        _client.close()
+    _client = None
+    db = None
+    opportunities = None
+    userprofiles = None
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,16 +131,49 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert many documents with timestamps in one round-trip (unordered)
+
+    Returns (inserted_ids, write_errors); a failing document doesn't stop the rest of the batch.
+    """
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    if not items:
+        return [], []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for item in items:
+        doc = item.model_dump() if isinstance(item, BaseModel) else item.copy()
+        doc['created_at'] = now
+        doc['updated_at'] = now
+        docs.append(doc)
+
+    try:
+        await db[collection_name].insert_many(docs, ordered=False)
+        write_errors = []
+    except BulkWriteError as e:
+        write_errors = [
+            {"index": err["index"], "code": err["code"], "errmsg": err["errmsg"]}
+            for err in e.details.get("writeErrors", [])
+        ]
+
+    # insert_many assigns _id on each document before sending
+    failed = {err["index"] for err in write_errors}
+    inserted_ids = [str(doc["_id"]) for i, doc in enumerate(docs) if i not in failed]
+    return inserted_ids, write_errors
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get documents from collection, optionally restricted to the projected fields"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = db[collection_name].find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    # Motor reads length=0 as "return nothing"; no limit means all documents
+    return await cursor.to_list(length=limit or None)
@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration for production
+
+Run with: gunicorn -c gunicorn_conf.py main:app
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", 2 * (os.cpu_count() or 1) + 1))
+# Picks up uvloop and httptools (see requirements.txt) via loop="auto"/http="auto"
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+
+# database.py sizes each worker's pool from WEB_CONCURRENCY
+os.environ.setdefault("WEB_CONCURRENCY", str(workers))
+
+
+def on_starting(server):
+    # One-off data migration in the master, before any worker forks
+    import database
+    try:
+        updated = database.backfill_deadline_days()
+        server.log.info("Backfilled deadline_days on %s opportunities", updated)
+    except Exception as e:
+        server.log.warning("deadline_days backfill failed: %s", e)
@@ -1,29 +1,85 @@
 import os
-from fastapi import FastAPI, HTTPException
+import time
+import logging
+import orjson
+from contextlib import asynccontextmanager
+from fastapi import Body, FastAPI, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, TypeAdapter
 from typing import List, Optional
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from datetime import datetime, timezone
+from cachetools import TTLCache
 
-from database import db, create_document, get_documents
-from schemas import Opportunity, UserProfile
+import database
+from database import create_document, create_documents
+from schemas import Opportunity, OpportunityOut, UserProfile
 
-app = FastAPI(title="Dalilah API", version="0.1.0")
+logger = logging.getLogger(__name__)
+
+# Built once; renders card lists straight to JSON bytes without FastAPI's jsonable_encoder pass
+OppOutAdapter = TypeAdapter(List[OpportunityOut])
+
+class MongoJSONResponse(ORJSONResponse):
+    """orjson renderer for raw Mongo documents: ObjectId via str(), UTC datetimes as "...Z"
+
+    "Z" matches what OppOutAdapter.dump_json emits, so a card's dates read the same on
+    every endpoint. FastAPI runs jsonable_encoder before render() on plain return
+    values, so these options only apply when a handler returns this response directly.
+    """
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NAIVE_UTC | orjson.OPT_UTC_Z)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Created per worker so forked gunicorn processes don't share a pool
+    database.connect_db()
+    try:
+        await database.ensure_indexes()
+    except Exception as e:
+        # Don't keep the worker from booting; queries still work, just unindexed
+        logger.warning("Index creation failed: %s", e)
+    yield
+    database.close_db()
+
+app = FastAPI(title="Dalilah API", version="0.1.0", default_response_class=MongoJSONResponse, lifespan=lifespan)
+
+# Comma-separated list of frontend origins, e.g. "https://dalilah.sa,https://admin.dalilah.sa"
+cors_origins = [o.strip() for o in os.getenv("CORS_ORIGINS", "").split(",") if o.strip()]
+if not cors_origins:
+    logger.warning("CORS_ORIGINS is not set; browsers on other origins will be blocked")
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
+    allow_origins=cors_origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["Authorization", "Content-Type"],
+    # Let browsers reuse preflight results for a day
+    max_age=86400,
 )
 
 @app.get("/")
 def read_root():
     return {"message": "Dalilah backend is running"}
 
+# (fetched_at, names) for /test; load balancers hit it often and listing collections is an admin round-trip
+_collections_cache = (float("-inf"), [])
+COLLECTIONS_TTL_SECONDS = 30
+
+async def cached_collection_names() -> list:
+    global _collections_cache
+    fetched_at, names = _collections_cache
+    if time.monotonic() - fetched_at > COLLECTIONS_TTL_SECONDS:
+        names = await database.db.list_collection_names()
+        _collections_cache = (time.monotonic(), names)
+    return names
+
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -34,13 +90,13 @@ def test_database():
     }
 
     try:
-        if db is not None:
+        if database.db is not None:
             response["database"] = "✅ Connected & Working"
             response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-            response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
+            response["database_name"] = database.db.name
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await cached_collection_names()
                 response["collections"] = collections[:10]
             except Exception as e:
                 response["database"] = f"⚠️  Connected but Error: {str(e)[:50]}"
@@ -51,24 +107,97 @@ def test_database():
 
     return response
 
+# ---------------------------
+# Read caches (per worker)
+# ---------------------------
+
+# Writes in this worker clear them right away; the TTL bounds staleness from writes in other workers
+opportunities_cache = TTLCache(maxsize=1024, ttl=30)
+recommendations_cache = TTLCache(maxsize=1024, ttl=30)
+
+# Bumped on every clear. Readers capture it before querying and only store their
+# result if no write cleared the caches while the query was in flight.
+cache_generation = 0
+
+def clear_read_caches():
+    global cache_generation
+    cache_generation += 1
+    opportunities_cache.clear()
+    recommendations_cache.clear()
+
+# ---------------------------
+# Recency scoring (materialized at write time)
+# ---------------------------
+
+# Recency term of a recommendation's total_score
+RECENCY_SCORE = {"$divide": [{"$ifNull": ["$deadline_days", 0]}, 1000]}
+
+def deadline_days(application_deadline: Optional[datetime]) -> int:
+    """Whole days from the epoch to the deadline, 0 when there is none"""
+    if application_deadline is None:
+        return 0
+    if application_deadline.tzinfo is not None:
+        application_deadline = application_deadline.astimezone(timezone.utc).replace(tzinfo=None)
+    return (application_deadline - datetime(1970, 1, 1)).days
+
 # ---------------------------
 # Opportunities CRUD (reviewed curation flow)
 # ---------------------------
 
-@app.post("/opportunities", response_model=dict)
-def create_opportunity(opportunity: Opportunity):
+# Fields needed to render an opportunity card; long text like description/eligibility stays in Mongo.
+# The server returns _id as a string "id" so responses need no per-document ObjectId pass.
+OPPORTUNITY_CARD_FIELDS = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "title": 1,
+    "category": 1,
+    "city": 1,
+    "mode": 1,
+    "url": 1,
+    "application_deadline": 1,
+    "tags": 1,
+    "status": 1,
+}
+
+def opportunity_document(opportunity: Opportunity) -> dict:
+    """Mongo document for a submitted opportunity"""
     # New entries are pending review by default unless already verified
-    data = opportunity.model_dump()
+    data = opportunity.model_dump(exclude_none=True)
+    # HttpUrl isn't BSON-encodable; store the plain string
+    data["url"] = str(opportunity.url)
     if data.get("verified"):
         data["status"] = "published"
     else:
         data["status"] = "pending_review"
+    data["deadline_days"] = deadline_days(data.get("application_deadline"))
+    return data
 
-    inserted_id = create_document("opportunity", data)
+@app.post("/opportunities", response_model=dict)
+async def create_opportunity(opportunity: Opportunity):
+    inserted_id = await create_document("opportunity", opportunity_document(opportunity))
+    clear_read_caches()
     return {"id": inserted_id}
 
-@app.get("/opportunities", response_model=List[dict])
-def list_opportunities(category: Optional[str] = None, city: Optional[str] = None, published_only: bool = True, q: Optional[str] = None, limit: int = 50):
+# Upper bound on documents per bulk request
+BULK_MAX_ITEMS = 500
+
+@app.post("/opportunities/bulk", response_model=dict)
+async def create_opportunities_bulk(opportunities: List[Opportunity] = Body(..., max_length=BULK_MAX_ITEMS)):
+    try:
+        inserted_ids, errors = await create_documents("opportunity", [opportunity_document(o) for o in opportunities])
+    finally:
+        # Part of the batch may have landed even if the call raised
+        clear_read_caches()
+    return {"ids": inserted_ids, "errors": errors}
+
+@app.get("/opportunities", response_model=None)
+async def list_opportunities(category: Optional[str] = None, city: Optional[str] = None, published_only: bool = True, q: Optional[str] = None, limit: int = Query(50, ge=1, le=200)):
+    cache_key = (category, city, published_only, q, limit)
+    cached = opportunities_cache.get(cache_key)
+    if cached is not None:
+        return Response(cached, media_type="application/json")
+    generation = cache_generation
+
     filter_query = {}
     if published_only:
         filter_query["status"] = "published"
@@ -79,91 +208,167 @@ def list_opportunities(category: Optional[str] = None, city: Optional[str] = Non
     if q:
         filter_query["$text"] = {"$search": q}
 
-    docs = get_documents("opportunity", filter_query, limit)
-    # Convert ObjectId to string for frontend safety
-    for d in docs:
-        if isinstance(d.get("_id"), ObjectId):
-            d["id"] = str(d.pop("_id"))
-    return docs
+    if database.db is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+    cursor = database.opportunities.find(filter_query, OPPORTUNITY_CARD_FIELDS).limit(limit)
+    docs = await cursor.to_list(length=limit)
+    body = OppOutAdapter.dump_json(OppOutAdapter.validate_python(docs))
+    if generation == cache_generation:
+        opportunities_cache[cache_key] = body
+    return Response(body, media_type="application/json")
+
+@app.get("/opportunities/{id}")
+async def get_opportunity(id: str):
+    """Full opportunity document; list endpoints only carry card fields"""
+    if database.db is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+    if not ObjectId.is_valid(id):
+        raise HTTPException(status_code=400, detail="Invalid ID")
+
+    doc = await database.opportunities.find_one({"_id": ObjectId(id)}, {"deadline_days": 0})
+    if doc is None:
+        raise HTTPException(status_code=404, detail="Opportunity not found")
+    doc["id"] = str(doc.pop("_id"))
+    return MongoJSONResponse(doc)
 
 @app.post("/opportunities/{id}/verify")
-def verify_opportunity(id: str):
-    if db is None:
+async def verify_opportunity(id: str):
+    if database.db is None:
         raise HTTPException(status_code=500, detail="Database not available")
-    try:
-        result = db["opportunity"].update_one({"_id": ObjectId(id)}, {"$set": {"verified": True, "status": "published"}})
-        if result.matched_count == 0:
-            raise HTTPException(status_code=404, detail="Opportunity not found")
-        return {"ok": True}
-    except Exception:
+    if not ObjectId.is_valid(id):
         raise HTTPException(status_code=400, detail="Invalid ID")
 
+    result = await database.opportunities.update_one({"_id": ObjectId(id)}, [{"$set": {
+        "verified": True,
+        "status": "published",
+        # Server-side twin of deadline_days(), shared with the startup backfill
+        "deadline_days": database.DEADLINE_DAYS_EXPR,
+    }}])
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="Opportunity not found")
+    clear_read_caches()
+    return {"ok": True}
+
 # ---------------------------
 # User profiles & recommendations
 # ---------------------------
 
 @app.post("/profiles", response_model=dict)
-def create_profile(profile: UserProfile):
-    inserted_id = create_document("userprofile", profile)
+async def create_profile(profile: UserProfile):
+    try:
+        inserted_id = await create_document("userprofile", profile.model_dump(exclude_none=True))
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Profile already exists")
     return {"id": inserted_id}
 
-@app.get("/recommendations/{email}")
-def get_recommendations(email: str, limit: int = 20):
-    if db is None:
-        raise HTTPException(status_code=500, detail="Database not available")
+@app.post("/profiles/bulk", response_model=dict)
+async def create_profiles_bulk(profiles: List[UserProfile] = Body(..., max_length=BULK_MAX_ITEMS)):
+    inserted_ids, errors = await create_documents("userprofile", [p.model_dump(exclude_none=True) for p in profiles])
+    return {"ids": inserted_ids, "errors": errors}
 
-    # Fetch user profile
-    profiles = get_documents("userprofile", {"email": email}, limit=1)
-    if not profiles:
-        raise HTTPException(status_code=404, detail="Profile not found")
-    profile = profiles[0]
-
-    interests = set((profile.get("interests") or []))
-    location = profile.get("location")
+# Parts of the recommendation query that never vary, built once and shared across
+# requests (the driver only reads them). Keeping one shape also helps the plan cache.
+_REMOTE_MODES = {"mode": {"$in": ["online", "hybrid"]}}
+_RECOMMENDATION_SCORE_STAGE = {"$project": {
+    **OPPORTUNITY_CARD_FIELDS,
+    "total_score": {"$add": [{"$meta": "textScore"}, RECENCY_SCORE]},
+}}
+_RECOMMENDATION_SORT_STAGE = {"$sort": {"total_score": -1}}
 
-    # Build a relevance filter
+def recommendation_filter(location: Optional[str]) -> dict:
+    """Published opportunities reachable from the profile's location"""
+    # On the find path (no interests) status is pushed into each $or branch, so both
+    # branches seek an index: {status, city, category} and {status, mode}. With $text
+    # the planner always uses the text index and these filter its matches instead.
     match_stage = {"status": "published"}
     if location:
-        match_stage["$or"] = [
-            {"city": location},
-            {"mode": {"$in": ["online", "hybrid"]}}
-        ]
+        match_stage["$or"] = [{"city": location}, _REMOTE_MODES]
+    return match_stage
+
+def text_search_terms(interests) -> str:
+    """$search string OR-ing the interests as plain terms"""
+    # $text reads a leading "-" as negation and quotes as a phrase; strip both
+    words = []
+    for interest in interests:
+        for word in interest.replace('"', " ").split():
+            word = word.lstrip("-")
+            if word:
+                words.append(word)
+    return " ".join(words)
 
-    pipeline = [
+def recommendation_pipeline(search: str, location: Optional[str], limit: int) -> list:
+    """Aggregation ranking opportunities by interest match and recency; $match is always stage 0"""
+    match_stage = recommendation_filter(location)
+    # Score interests through the text index instead of intersecting tags per document
+    match_stage["$text"] = {"$search": search}
+
+    # Later enrichment stages (e.g. a $lookup of organization details) belong after
+    # $match so they only see the filtered candidates
+    return [
         {"$match": match_stage},
-        {"$addFields": {
-            "interest_score": {"$size": {"$setIntersection": ["$tags", list(interests)]}},
-            "recency_score": {"$cond": [
-                {"$gt": ["$application_deadline", None]},
-                {"$divide": [
-                    {"$subtract": ["$application_deadline", 0]},
-                    1000 * 60 * 60 * 24
-                ]},
-                0
-            ]}
-        }},
-        {"$addFields": {"total_score": {"$add": ["$interest_score", {"$divide": ["$recency_score", 1000]}]}}},
-        {"$sort": {"total_score": -1}},
+        # Trim to card fields and score in a single rewrite
+        _RECOMMENDATION_SCORE_STAGE,
+        _RECOMMENDATION_SORT_STAGE,
         {"$limit": limit}
     ]
 
+def recent_recommendations_cursor(location: Optional[str], limit: int, exclude_ids: Optional[List[str]] = None):
+    """Recency-ranked opportunities, skipping ids already recommended"""
+    # Score is recency alone here, so an index-backed find on {status, deadline_days}
+    # returns the same order an aggregation would
+    filter_query = recommendation_filter(location)
+    if exclude_ids:
+        filter_query["_id"] = {"$nin": [ObjectId(i) for i in exclude_ids]}
+    return database.opportunities.find(
+        filter_query,
+        {**OPPORTUNITY_CARD_FIELDS, "total_score": RECENCY_SCORE},
+    ).sort("deadline_days", -1).limit(limit)
+
+@app.get("/recommendations/{email}")
+async def get_recommendations(email: str, limit: int = Query(20, ge=1, le=100)):
+    if database.db is None:
+        raise HTTPException(status_code=500, detail="Database not available")
+
+    # Fetch user profile
+    profile = await database.userprofiles.find_one({"email": email})
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    # updated_at in the key means an edited profile never reads a stale entry
+    cache_key = (email, limit, profile.get("updated_at"))
+    cached = recommendations_cache.get(cache_key)
+    if cached is not None:
+        return MongoJSONResponse(cached)
+    generation = cache_generation
+
+    interests = set((profile.get("interests") or []))
+    location = profile.get("location")
+    search = text_search_terms(interests)
+
     try:
-        docs = list(db["opportunity"].aggregate(pipeline))
-        for d in docs:
-            if isinstance(d.get("_id"), ObjectId):
-                d["id"] = str(d.pop("_id"))
-        return {"items": docs}
+        docs = []
+        if search:
+            pipeline = recommendation_pipeline(search, location, limit)
+            docs = await database.opportunities.aggregate(pipeline).to_list(length=limit)
+        # $text only returns matches: interests that match nothing (or are all stop
+        # words like "IT") would leave the list short, so fill it by recency
+        if len(docs) < limit:
+            cursor = recent_recommendations_cursor(location, limit - len(docs), [d["id"] for d in docs])
+            docs += await cursor.to_list(length=limit - len(docs))
+        content = {"items": docs}
+        if generation == cache_generation:
+            recommendations_cache[cache_key] = content
+        # Returned directly so orjson serializes the documents without a jsonable_encoder pass
+        return MongoJSONResponse(content)
     except Exception as e:
         # Fallback: simple filter if aggregation not supported in env
-        filter_query = {"status": "published"}
-        docs = get_documents("opportunity", filter_query, limit)
-        for d in docs:
-            if isinstance(d.get("_id"), ObjectId):
-                d["id"] = str(d.pop("_id"))
-        return {"items": docs, "note": "Fallback recommendations"}
+        cursor = database.opportunities.find({"status": "published"}, OPPORTUNITY_CARD_FIELDS).limit(limit)
+        docs = await cursor.to_list(length=limit)
+        return MongoJSONResponse({"items": docs, "note": "Fallback recommendations"})
 
 
-if __name__ == "__main__":
+if __name__ == "__main__" and os.getenv("DEV") == "1":
+    # Local development only; production runs under gunicorn (see gunicorn_conf.py)
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(app, host="0.0.0.0", port=port, loop="uvloop", http="httptools")
@@ -6,49 +6,57 @@ is the lowercase of the class name.
 
 - Opportunity -> "opportunity"
 - UserProfile -> "userprofile"
+
+OpportunityOut is not a collection; it is the card projection of
+"opportunity" returned by list endpoints.
 """
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, ConfigDict, Field, HttpUrl
 from typing import List, Optional, Literal
 from datetime import datetime
+from enum import Enum
 
-SaudiCity = Literal[
-    "Riyadh",
-    "Jeddah",
-    "Dammam",
-    "Khobar",
-    "Dhahran",
-    "Madinah",
-    "Makkah",
-    "Tabuk",
-    "Abha",
-    "Taif",
-    "Qassim",
-    "Hail",
-    "Jazan",
-    "Najran",
-    "Al Baha",
-    "Al Jouf",
-    "Al Ahsa",
-    "Other"
-]
+# str Enums rather than Literal: pydantic validates them with a hash lookup
+class SaudiCity(str, Enum):
+    RIYADH = "Riyadh"
+    JEDDAH = "Jeddah"
+    DAMMAM = "Dammam"
+    KHOBAR = "Khobar"
+    DHAHRAN = "Dhahran"
+    MADINAH = "Madinah"
+    MAKKAH = "Makkah"
+    TABUK = "Tabuk"
+    ABHA = "Abha"
+    TAIF = "Taif"
+    QASSIM = "Qassim"
+    HAIL = "Hail"
+    JAZAN = "Jazan"
+    NAJRAN = "Najran"
+    AL_BAHA = "Al Baha"
+    AL_JOUF = "Al Jouf"
+    AL_AHSA = "Al Ahsa"
+    OTHER = "Other"
 
-OpportunityCategory = Literal[
-    "hackathon",
-    "event",
-    "course",
-    "accelerator",
-    "incubator",
-    "program"
-]
+class OpportunityCategory(str, Enum):
+    HACKATHON = "hackathon"
+    EVENT = "event"
+    COURSE = "course"
+    ACCELERATOR = "accelerator"
+    INCUBATOR = "incubator"
+    PROGRAM = "program"
 
-OpportunityMode = Literal["online", "offline", "hybrid"]
+class OpportunityMode(str, Enum):
+    ONLINE = "online"
+    OFFLINE = "offline"
+    HYBRID = "hybrid"
 
 class Opportunity(BaseModel):
     """
     Curated professional opportunity in KSA
     Collection: "opportunity"
     """
+    model_config = ConfigDict(use_enum_values=True)
+
     title: str = Field(..., description="Opportunity title")
     description: str = Field(..., description="Short description")
     category: OpportunityCategory = Field(..., description="Type of opportunity")
@@ -69,11 +77,31 @@ class Opportunity(BaseModel):
         "pending_review", description="Moderation status"
     )
 
+class OpportunityOut(BaseModel):
+    """
+    Opportunity card as returned by list endpoints
+    Projection of: "opportunity"
+
+    Deliberately loose: it describes what is stored, not what new input must
+    satisfy, so one legacy document can't fail a whole listing.
+    """
+    id: str
+    title: Optional[str] = None
+    category: Optional[str] = None
+    city: Optional[str] = None
+    mode: Optional[str] = None
+    url: Optional[str] = None
+    application_deadline: Optional[datetime] = None
+    tags: List[str] = Field(default_factory=list)
+    status: Optional[str] = None
+
 class UserProfile(BaseModel):
     """
     User profile captured for personalization
     Collection: "userprofile"
     """
+    model_config = ConfigDict(use_enum_values=True)
+
     name: str
     email: str
     location: Optional[SaudiCity] = None